@@ -1,95 +1,246 @@
 import os
-import struct
 import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.lines import Line2D
 import argparse
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+try:
+  import pyarrow as pa
+  import pyarrow.compute as pc
+  import pyarrow.csv as pacsv
+except ImportError:
+  # pyarrow é opcional: sem ele, o CSV é lido com pandas.read_csv
+  pa = None
+  pc = None
+  pacsv = None
+
+# Registro binário: {int16_t voltage_raw, int64_t timestamp_us}, little-endian, sem padding
+# (FileManager grava os dois campos em sequência, então o int64 fica no offset 2)
+RECORD_DTYPE = np.dtype([('voltage', '<i2'), ('timestamp', '<i8')], align=False)
+assert RECORD_DTYPE.itemsize == 10, "Binary record layout must be packed (10 bytes)"
+
+# Resolução do ADS1115 (kVoltageRange = 4.096V em config.h): volts por LSB
+VOLTS_PER_LSB = np.float32(4.096 / 32768.0)
+
+# Remove DC offset (VCC/2 = 1.65V for 3.3V supply)
+DC_OFFSET = 1.65
+
+# Colunas do CSV gerado pelo FileManager e seus tipos
+# (timestamp_us lido como float64 e truncado para int64, como o int(float(...)) original)
+CSV_DTYPES = {'timestamp_us': 'float64', 'voltage': 'float32', 'classification': 'category'}
+
+# Agg divide linhas longas em blocos de vértices e simplifica segmentos redundantes
+plt.rcParams['agg.path.chunksize'] = 10000
+plt.rcParams['path.simplify'] = True
+
+def relative_time_sec(timestamps):
+  # Tempo relativo à primeira amostra, em segundos (float64 contíguo, calculado uma única vez)
+  time_sec = (timestamps - timestamps[0]).astype(np.float64)
+  time_sec *= 1e-6
+  return time_sec
+
 
 def read_binary_file(filename):
   if not os.path.isfile(filename):
     raise FileNotFoundError(f"The file '{filename}' was not found.")
 
-  with open(filename, 'rb') as f:
-    data = f.read()
-  
-  record_size = 10
-  if len(data) % record_size != 0:
+  record_size = RECORD_DTYPE.itemsize
+  file_size = os.path.getsize(filename)
+  if file_size % record_size != 0:
     raise ValueError(f"File size is not a multiple of {record_size} bytes.")
+  if file_size == 0:
+    raise ValueError("Binary file contains no data")
 
-  num_records = len(data) // record_size
-  voltages_raw = np.empty(num_records, dtype=np.int16)
-  timestamps = np.empty(num_records, dtype=np.int64)
+  # Mapeia o arquivo em memória: o SO carrega as páginas sob demanda, sem cópia integral
+  records = np.memmap(filename, dtype=RECORD_DTYPE, mode='r')
+  timestamps = np.ascontiguousarray(records['timestamp'])
 
-  for i in range(num_records):
-    offset = i * record_size
-    raw = data[offset:offset + record_size]
+  # Conversão para volts em uma única passada, direto no array de saída
+  voltages = np.empty(len(records), dtype=np.float32)
+  np.multiply(records['voltage'], VOLTS_PER_LSB, out=voltages, dtype=np.float32)
 
-    (voltage,) = struct.unpack('<h', raw[0:2])
-    (timestamp,) = struct.unpack('<q', raw[2:10])
+  return voltages, timestamps, relative_time_sec(timestamps), None
 
-    voltages_raw[i] = voltage
-    timestamps[i] = timestamp
 
-  voltages = voltages_raw.astype(np.float32) * 4.096 / 32768.0
+def _read_csv_header(filename):
+  # Nomes das colunas sem espaços, lidos da primeira linha (usados por ambos os parsers)
+  with open(filename, 'r') as f:
+    return [col.strip() for col in f.readline().split(',')]
 
-  return voltages, timestamps, None
 
+def _read_csv_arrow(filename, columns):
+  # Parser multithread do pyarrow (libera o GIL); convertido para DataFrame no final
+  # timestamp_us lido como float64 e truncado para int64, como no caminho do pandas (CSV_DTYPES)
+  column_types = {
+    'timestamp_us': pa.float64(),
+    'voltage': pa.float32(),
+    'classification': pa.string(),
+  }
+  table = pacsv.read_csv(filename,
+                         read_options=pacsv.ReadOptions(column_names=columns, skip_rows=1),
+                         convert_options=pacsv.ConvertOptions(
+                           column_types=column_types,
+                           null_values=[''],
+                           strings_can_be_null=True,
+                           include_columns=[col for col in columns if col in CSV_DTYPES]))
 
-def read_csv_file(filename):
-  if not os.path.isfile(filename):
-    raise FileNotFoundError(f"The file '{filename}' was not found.")
-  
-  timestamps = []
-  voltages = []
-  classifications = []
-  
+  if 'timestamp_us' in table.column_names:
+    index = table.column_names.index('timestamp_us')
+    table = table.set_column(index, 'timestamp_us',
+                             table['timestamp_us'].cast(pa.int64(), safe=False))
+  if 'classification' in table.column_names:
+    index = table.column_names.index('classification')
+    table = table.set_column(index, 'classification',
+                             pc.utf8_trim_whitespace(table['classification']).dictionary_encode())
+  return table.to_pandas()
+
+
+def _read_csv_chunks(filename, chunksize):
+  if os.path.getsize(filename) == 0:
+    raise ValueError("CSV file contains no data")
+
+  # Parser em C do pandas; somente as colunas de interesse são carregadas
+  columns = _read_csv_header(filename)
+  read_options = dict(names=columns,
+                      header=0,
+                      usecols=lambda col: col in CSV_DTYPES,
+                      dtype=CSV_DTYPES,
+                      keep_default_na=False,
+                      na_values=[''],
+                      skipinitialspace=True)
   try:
-    with open(filename, 'r') as f:
-      # Ler primeira linha (cabeçalho)
-      header = f.readline().strip()
-      columns = [col.strip() for col in header.split(',')]
-      
-      # Verificar se as colunas necessárias existem
-      if 'timestamp_us' not in columns:
-        raise ValueError("Column 'timestamp_us' not found in CSV file")
-      if 'voltage' not in columns:
-        raise ValueError("Column 'voltage' not found in CSV file")
-      
-      timestamp_idx = columns.index('timestamp_us')
-      voltage_idx = columns.index('voltage')
-      classification_idx = columns.index('classification') if 'classification' in columns else None
-      
-      # Ler dados
-      for line_num, line in enumerate(f, start=2):
-        line = line.strip()
-        if not line:  # Pular linhas vazias
-          continue
-            
-        parts = line.split(',')
-        if len(parts) != len(columns):
-          raise ValueError(f"Line {line_num}: Expected {len(columns)} columns, got {len(parts)}")
-        
-        try:
-          timestamp = int(float(parts[timestamp_idx]))
-          voltage = float(parts[voltage_idx])
-          classification = parts[classification_idx].strip() if classification_idx is not None else 'N'
-          
-          timestamps.append(timestamp)
-          voltages.append(voltage)
-          classifications.append(classification)
-        except ValueError as e:
-          raise ValueError(f"Line {line_num}: Invalid data format - {e}")
-    
-    if not timestamps:
-        raise ValueError("CSV file contains no data")
-    
-    return (np.array(voltages, dtype=np.float32), 
-            np.array(timestamps, dtype=np.int64),
-            classifications if classification_idx is not None else None)
-      
+    if chunksize is None and pacsv is not None:
+      yield _read_csv_arrow(filename, columns)
+      return
+
+    # O pandas não rejeita linhas com campos a mais (usa a primeira coluna como índice
+    # ou descarta o excedente): conferir a contagem de campos antes
+    _check_csv_fields(filename, len(columns))
+    if chunksize is None:
+      yield pd.read_csv(filename, **read_options)
+    else:
+      # Leitura em blocos: o pico de memória fica limitado ao tamanho do bloco
+      yield from pd.read_csv(filename, chunksize=chunksize, **read_options)
+  except pd.errors.EmptyDataError:
+    raise ValueError("CSV file contains no data")
+  except ValueError as e:
+    raise ValueError(f"Invalid data format - {e}")
   except IOError as e:
     raise ValueError(f"Error reading CSV file: {e}")
 
 
+def _check_csv_fields(filename, n_columns):
+  # Campos por linha = vírgulas + 1, como o split(',') original; linhas em branco são ignoradas.
+  # Contagem vetorizada em blocos binários de linhas completas
+  with open(filename, 'rb') as f:
+    f.readline()  # cabeçalho
+    line_num = 1
+    tail = b''
+    for block in iter(lambda: f.read(1 << 20), b''):
+      block = tail + block
+      cut = block.rfind(b'\n') + 1
+      block, tail = block[:cut], block[cut:]
+      line_num = _check_block_fields(block, line_num, n_columns)
+    _check_block_fields(tail + b'\n', line_num, n_columns)
+
+
+def _check_block_fields(block, line_num, n_columns):
+  # block contém apenas linhas completas; line_num é o número da linha anterior ao bloco
+  data = np.frombuffer(block, dtype=np.uint8)
+  ends = np.flatnonzero(data == ord('\n'))
+  commas = np.flatnonzero(data == ord(','))
+  line_commas = np.diff(np.searchsorted(commas, ends), prepend=0)
+
+  # Só as linhas com contagem diferente são inspecionadas: linhas em branco são aceitas
+  for index in np.flatnonzero(line_commas != n_columns - 1):
+    start = ends[index - 1] + 1 if index > 0 else 0
+    if block[start:ends[index]].strip():
+      raise ValueError(f"Line {line_num + index + 1}: Expected {n_columns} columns, got {line_commas[index] + 1}")
+  return line_num + len(ends)
+
+
+def _count_data_rows(filename):
+  # Limite superior de linhas de dados (quebras de linha menos o cabeçalho), lendo em blocos binários
+  newlines = 0
+  last_byte = b'\n'
+  with open(filename, 'rb') as f:
+    for block in iter(lambda: f.read(1 << 20), b''):
+      newlines += block.count(b'\n')
+      last_byte = block[-1:]
+  lines = newlines + (last_byte != b'\n')
+  return max(lines - 1, 0)
+
+
+def _check_csv_columns(df):
+  # Verificar se as colunas necessárias existem
+  if 'timestamp_us' not in df.columns:
+    raise ValueError("Column 'timestamp_us' not found in CSV file")
+  if 'voltage' not in df.columns:
+    raise ValueError("Column 'voltage' not found in CSV file")
+
+
+def _check_csv_values(df):
+  # Campos vazios viram NaN (só '' conta como ausente; rótulos como 'NA' são mantidos): rejeitar
+  for column in ('timestamp_us', 'voltage', 'classification'):
+    if column in df.columns:
+      missing = df[column].isna().to_numpy()
+      if missing.any():
+        row = df.index[missing.argmax()] + 1
+        raise ValueError(f"Invalid data format - row {row}: missing value in column '{column}'")
+
+
+def read_csv_file(filename, chunksize=None):
+  if not os.path.isfile(filename):
+    raise FileNotFoundError(f"The file '{filename}' was not found.")
+
+  if chunksize is None:
+    df = next(_read_csv_chunks(filename, None))
+    _check_csv_columns(df)
+    _check_csv_values(df)
+    if df.empty:
+      raise ValueError("CSV file contains no data")
+
+    voltages = df['voltage'].to_numpy(dtype=np.float32)
+    timestamps = df['timestamp_us'].to_numpy().astype(np.int64)
+    classifications = df['classification'].tolist() if 'classification' in df.columns else None
+    return voltages, timestamps, relative_time_sec(timestamps), classifications
+
+  # Leitura em blocos direto para arrays pré-alocados (sem listas nem concatenação)
+  capacity = _count_data_rows(filename)
+  voltages = np.empty(capacity, dtype=np.float32)
+  timestamps = np.empty(capacity, dtype=np.int64)
+  classifications = None
+  filled = 0
+
+  for chunk in _read_csv_chunks(filename, chunksize):
+    _check_csv_columns(chunk)
+    _check_csv_values(chunk)
+    if classifications is None and 'classification' in chunk.columns:
+      classifications = np.empty(capacity, dtype=object)
+
+    end = filled + len(chunk)
+    voltages[filled:end] = chunk['voltage'].to_numpy(dtype=np.float32)
+    timestamps[filled:end] = chunk['timestamp_us'].to_numpy().astype(np.int64)
+    if classifications is not None:
+      classifications[filled:end] = chunk['classification'].to_numpy(dtype=object)
+    filled = end
+
+  if filled == 0:
+    raise ValueError("CSV file contains no data")
+
+  # Linhas em branco ignoradas pelo parser deixam sobra no final
+  voltages, timestamps = voltages[:filled], timestamps[:filled]
+  if classifications is not None:
+    classifications = classifications[:filled]
+
+  return voltages, timestamps, relative_time_sec(timestamps), classifications
+
+
 def detect_file_type(filename):
   _, ext = os.path.splitext(filename.lower())
   if ext == '.csv':
@@ -98,20 +249,88 @@ def detect_file_type(filename):
     return 'binary'
 
 
-def plot_ecg(voltages, timestamps, classifications, filename, file_type):
+def read_file(filename, file_type='auto', chunksize=None):
+  if file_type == 'auto':
+    file_type = detect_file_type(filename)
+
   if file_type == 'csv':
-    time_sec = (timestamps - timestamps[0]) / 1e6
-  else:
-    time_sec = (timestamps - timestamps[0]) / 1e6
+    return read_csv_file(filename, chunksize)
+  return read_binary_file(filename)
+
+
+def read_many(filenames, file_type='auto', chunksize=None):
+  # Vários arquivos: cada um é lido em um processo separado (leitura independente por arquivo)
+  # Gera (filename, future) na ordem dos arquivos; o erro de um arquivo só aparece no
+  # future.result() dele. No máximo max_workers leituras ficam pendentes, então a memória
+  # não cresce com o número de arquivos enquanto os gráficos são exibidos um a um
+  reader = partial(read_file, file_type=file_type, chunksize=chunksize)
+  if len(filenames) == 1:
+    future = Future()
+    try:
+      future.set_result(reader(filenames[0]))
+    except Exception as e:
+      future.set_exception(e)
+    yield filenames[0], future
+    return
+
+  max_workers = min(len(filenames), os.cpu_count() or 1)
+  queued = iter(filenames)
+  with ProcessPoolExecutor(max_workers=max_workers) as executor:
+    pending = deque((filename, executor.submit(reader, filename))
+                    for filename in islice(queued, max_workers))
+    while pending:
+      filename, future = pending.popleft()
+      # Mantém os processos ocupados enquanto o arquivo atual é plotado
+      for next_filename in islice(queued, 1):
+        pending.append((next_filename, executor.submit(reader, next_filename)))
+      yield filename, future
+
 
-  # Remove DC offset (VCC/2 = 1.65V for 3.3V supply)
-  DC_OFFSET = 1.65
+def downsample_minmax(time_sec, voltages, n_bins):
+  # Decimação min/max: mantém o menor e o maior valor de cada bin (≈ coluna de pixel),
+  # preservando os picos do sinal com no máximo 2 pontos por bin
+  n = len(voltages)
+  if n <= 2 * n_bins:
+    return time_sec, voltages
+
+  bin_size = n // n_bins
+  usable = bin_size * n_bins
+  bins = voltages[:usable].reshape(n_bins, bin_size)
+  offsets = np.arange(n_bins) * bin_size
+  idx_min = bins.argmin(axis=1) + offsets
+  idx_max = bins.argmax(axis=1) + offsets
+
+  # Intercalar min/max em ordem temporal; amostras restantes entram sem decimação
+  indices = np.empty(2 * n_bins, dtype=np.intp)
+  indices[0::2] = np.minimum(idx_min, idx_max)
+  indices[1::2] = np.maximum(idx_min, idx_max)
+  indices = np.concatenate((indices, np.arange(usable, n)))
+
+  return time_sec[indices], voltages[indices]
+
+
+def attach_minmax_line(ax, line, time_sec, voltages):
+  # Redesenha a linha decimada apenas para o trecho visível a cada zoom/pan
+  def update(ax):
+    xmin, xmax = ax.get_xlim()
+    lo = max(np.searchsorted(time_sec, xmin, side='left') - 1, 0)
+    hi = np.searchsorted(time_sec, xmax, side='right') + 1
+    n_bins = max(int(ax.bbox.width), 1)
+    line.set_data(*downsample_minmax(time_sec[lo:hi], voltages[lo:hi], n_bins))
+
+  ax.callbacks.connect('xlim_changed', update)
+
+
+def plot_ecg(voltages, time_sec, classifications, filename):
   voltages_ac = voltages - DC_OFFSET
 
   fig, ax = plt.subplots(figsize=(15, 6), dpi=100)
 
-  # Plot do sinal ECG
-  ecg_line = ax.plot(time_sec, voltages_ac, label="ECG Signal", linewidth=1, color='blue')
+  # Plot do sinal ECG (decimado para ~2 pontos por coluna de pixel)
+  n_bins = int(fig.get_size_inches()[0] * fig.dpi)
+  ecg_line = ax.plot(*downsample_minmax(time_sec, voltages_ac, n_bins),
+                     label="ECG Signal", linewidth=1, color='blue', rasterized=True)
+  attach_minmax_line(ax, ecg_line[0], time_sec, voltages_ac)
 
   # Preparar handles e labels para controle da ordem da legenda
   legend_handles = [ecg_line[0]]
@@ -128,36 +347,39 @@ def plot_ecg(voltages, timestamps, classifications, filename, file_type):
       'T': {'color': 'purple', 'marker': 'o', 'size': 35, 'label': 'T Wave'}
     }
     
-    # Agrupar pontos por classificação para eficiência
-    classification_groups = {}
-    for i, classification in enumerate(classifications):
-      if classification in classification_styles:  # P, Q, R, S, T
-        if classification not in classification_groups:
-          classification_groups[classification] = {'times': [], 'voltages': []}
-        classification_groups[classification]['times'].append(time_sec[i])
-        classification_groups[classification]['voltages'].append(voltages_ac[i])
-    
-    # Plotar na ordem desejada: P, Q, R, S, T
+    # Selecionar todos os pontos P, Q, R, S, T de uma vez (comparação vetorizada)
+    classifications = np.asarray(classifications)
     desired_order = ['P', 'Q', 'R', 'S', 'T']
+    mask = np.isin(classifications, desired_order)
+    marked = classifications[mask]
+
+    # Um único scatter com cor e tamanho por ponto
+    if marked.size > 0:
+      ax.scatter(time_sec[mask], voltages_ac[mask],
+                 c=[classification_styles[c]['color'] for c in marked],
+                 s=[classification_styles[c]['size'] for c in marked],
+                 marker='o',
+                 alpha=0.9,
+                 zorder=3)
+
+    # Legenda na ordem desejada: P, Q, R, S, T (handles substitutos)
+    classification_counts = {}
     for classification in desired_order:
-      if classification in classification_groups:
-        data = classification_groups[classification]
+      count = np.count_nonzero(marked == classification)
+      if count > 0:
+        classification_counts[classification] = count
         style = classification_styles[classification]
-        scatter = ax.scatter(data['times'], data['voltages'], 
-                          c=style['color'], 
-                          marker=style['marker'], 
-                          s=style['size'],
-                          alpha=0.9,
-                          zorder=3)
-        legend_handles.append(scatter)
+        legend_handles.append(Line2D([], [], linestyle='None',
+                                     color=style['color'],
+                                     marker=style['marker'],
+                                     markersize=np.sqrt(style['size']),
+                                     alpha=0.9))
         legend_labels.append(style['label'])
     
-    if len(classification_groups) > 0:
+    if len(classification_counts) > 0:
       print(f"Pontos marcados por classificação:")
-      for classification in desired_order:
-        if classification in classification_groups:
-          data = classification_groups[classification]
-          print(f"  {classification}: {len(data['times'])} pontos")
+      for classification, count in classification_counts.items():
+        print(f"  {classification}: {count} pontos")
     else:
       print("Nenhum ponto P, Q, R, S ou T encontrado para marcação")
 
@@ -176,43 +398,43 @@ def plot_ecg(voltages, timestamps, classifications, filename, file_type):
 
 def main():
   parser = argparse.ArgumentParser(description="Plot ECG data from binary or CSV file with classification markers")
-  parser.add_argument("filename", help="Caminho para o arquivo de entrada (binário ou CSV)")
+  parser.add_argument("filenames", nargs='+', metavar="filename",
+                      help="Caminho para o(s) arquivo(s) de entrada (binário ou CSV)")
   parser.add_argument("--type", choices=['binary', 'csv', 'auto'], default='auto',
                       help="Tipo de arquivo (auto detecta baseado na extensão)")
+  parser.add_argument("--chunksize", type=int, default=None,
+                      help="Lê o CSV em blocos de N linhas para limitar o uso de memória")
   args = parser.parse_args()
 
-  try:
-    if args.type == 'auto':
-      file_type = detect_file_type(args.filename)
-    else:
-      file_type = args.type
+  for filename in args.filenames:
+    file_type = detect_file_type(filename) if args.type == 'auto' else args.type
+    print(f"Reading {file_type} file: {filename}")
 
-    print(f"Reading {file_type} file: {args.filename}")
+  for filename, recording in read_many(args.filenames, args.type, args.chunksize):
+    if len(args.filenames) > 1:
+      print(f"\n{filename}:")
 
-    if file_type == 'csv':
-      voltages, timestamps, classifications = read_csv_file(args.filename)
-    else:
-      voltages, timestamps, classifications = read_binary_file(args.filename)
+    try:
+      voltages, timestamps, time_sec, classifications = recording.result()
 
-    print(f"Successfully loaded {len(voltages)} samples")
-    voltages_ac = voltages - 1.65
-    print(f"Voltage range (DC removed): {np.min(voltages_ac):.3f}V to {np.max(voltages_ac):.3f}V")
-    print(f"Duration: {(timestamps[-1] - timestamps[0]) / 1e6:.2f} seconds")
-    
-    if classifications is not None:
-      marked_points = len([c for c in classifications if c in ['R', 'Q', 'S', 'P', 'T']])
-      print(f"Classifications available: {marked_points} marked points (R, Q, S, P, T)")
-    else:
-      print("No classification data available (binary file or CSV without classification column)")
+      print(f"Successfully loaded {len(voltages)} samples")
+      print(f"Voltage range (DC removed): {np.min(voltages) - DC_OFFSET:.3f}V to {np.max(voltages) - DC_OFFSET:.3f}V")
+      print(f"Duration: {time_sec[-1]:.2f} seconds")
+      
+      if classifications is not None:
+        marked_points = np.count_nonzero(np.isin(classifications, ['R', 'Q', 'S', 'P', 'T']))
+        print(f"Classifications available: {marked_points} marked points (R, Q, S, P, T)")
+      else:
+        print("No classification data available (binary file or CSV without classification column)")
 
-    plot_ecg(voltages, timestamps, classifications, args.filename, file_type)
+      plot_ecg(voltages, time_sec, classifications, filename)
 
-  except FileNotFoundError as e:
-    print(f"Error: {e}")
-  except ValueError as e:
-    print(f"Error: {e}")
-  except Exception as e:
-    print(f"Unexpected error: {e}")
+    except FileNotFoundError as e:
+      print(f"Error: {e}")
+    except ValueError as e:
+      print(f"Error: {e}")
+    except Exception as e:
+      print(f"Unexpected error: {e}")
 
 
 if __name__ == "__main__":
@@ -5,74 +5,115 @@ ECG Binary Data Trimmer
 Extracts a time range from binary ECG files.
 
 File format: {int16_t raw_value, int64_t timestamp_us}
+
+Samples are memory-mapped as a numpy structured array (RECORD_DTYPE); the
+selected range is copied to the output file with sendfile().
 """
 
-import struct
+import os
 import sys
 import argparse
 from pathlib import Path
 
+import numpy as np
+
+# Record layout: int16 raw_value + int64 timestamp_us, little-endian, packed (10 bytes)
+RECORD_DTYPE = np.dtype([('raw_value', '<i2'), ('timestamp_us', '<i8')], align=False)
+assert RECORD_DTYPE.itemsize == 10
+
 def read_binary_samples(filename):
   """
-  Read all samples from binary file.
+  Map all samples from binary file.
+
+  The file is memory-mapped read-only, so pages are loaded on demand and
+  slices of the result are views into the mapping.
 
   Returns:
-    list of tuples: [(raw_value, timestamp_us), ...]
+    np.ndarray: Structured array with RECORD_DTYPE fields
+      'raw_value' and 'timestamp_us'.
   """
-  samples = []
-  record_size = 10 # 2 bytes (int16) + 8 bytes (int64)
-  
-  with open(filename, 'rb') as f:
-    while True:
-      data = f.read(record_size)
-      if len(data) < record_size:
-        break
+  # A trailing partial record is ignored
+  num_records = Path(filename).stat().st_size // RECORD_DTYPE.itemsize
+  if num_records == 0:
+    return np.empty(0, dtype=RECORD_DTYPE)
 
-      raw_value, timestamp_us = struct.unpack('<hq', data)
-      samples.append((raw_value, timestamp_us))
-  return samples
+  return np.memmap(filename, dtype=RECORD_DTYPE, mode='r', shape=(num_records,))
 
-def trim_samples(samples, t0_sec, t1_sec):
+def find_time_range(samples, t0_sec, t1_sec):
   """
-  Extract samples within time range [t0, t1].
+  Locate samples within time range [t0, t1].
+
+  Timestamps come from a steady clock and are written in acquisition
+  order, so the range is located with two binary searches. On a memory
+  map this only touches the pages along the search path.
 
   Args:
-    samples: List of (raw_value, timestamp_us) tuples.
+    samples: Structured array of (raw_value, timestamp_us) records.
     t0_sec: Start time in seconds (relative to first sample).
     t1_sec: End time in seconds (relative to first sample).
   
   Returns:
-    list: Filtered samples within time range.
+    tuple: (lo, hi) record indices, hi exclusive.
   """
-  if not samples:
-    return []
+  if len(samples) == 0:
+    return 0, 0
   
-  first_timestamp = samples[0][1]
+  timestamps = samples['timestamp_us']
+  first_timestamp = timestamps[0]
 
   t0_us = int(t0_sec * 1_000_000)
   t1_us = int(t1_sec * 1_000_000)
 
-  trimmed = []
-  for raw_value, timestamp_us in samples:
-    relative_time = timestamp_us - first_timestamp
-
-    if t0_us <= relative_time <= t1_us:
-      trimmed.append((raw_value, timestamp_us))
+  lo = np.searchsorted(timestamps, first_timestamp + t0_us, side='left')
+  hi = np.searchsorted(timestamps, first_timestamp + t1_us, side='right')
   
-  return trimmed
+  return int(lo), int(hi)
 
 def write_binary_samples(samples, filename):
   """
   Write samples to binary file.
 
+  The packed little-endian dtype matches the on-disk record layout, so the
+  array is written in a single call.
+
   Args:
-    samples: List of (raw_value, timestamp_us) tuples.
+    samples: Structured array of (raw_value, timestamp_us) records.
     filename: output file path.
   """
-  with open(filename, 'wb') as f:
-    for raw_value, timestamp_us in samples:
-      data = struct.pack('<hq', raw_value, timestamp_us)
-      f.write(data)
+  samples.astype(RECORD_DTYPE, copy=False).tofile(filename)
+
+def copy_records(input_filename, output_filename, lo, hi):
+  """
+  Copy records [lo, hi) from input file to output file.
+
+  Uses os.sendfile() so the data is copied inside the kernel without
+  passing through user space. Falls back to writing the mapped records
+  where sendfile() between files is not supported.
+
+  Args:
+    input_filename: input file path.
+    output_filename: output file path.
+    lo: First record index.
+    hi: End record index (exclusive).
+  """
+  offset = lo * RECORD_DTYPE.itemsize
+  remaining = (hi - lo) * RECORD_DTYPE.itemsize
+
+  with open(input_filename, 'rb', buffering=0) as src, \
+       open(output_filename, 'wb', buffering=0) as dst:
+    try:
+      while remaining > 0:
+        sent = os.sendfile(dst.fileno(), src.fileno(), offset, remaining)
+        if sent == 0:
+          raise EOFError(f"Unexpected end of file: {input_filename}")
+        offset += sent
+        remaining -= sent
+      return
+    except (AttributeError, OSError):
+      if offset != lo * RECORD_DTYPE.itemsize:
+        raise
+
+  write_binary_samples(read_binary_samples(input_filename)[lo:hi], output_filename)
 
 def format_time(seconds):
   """Format seconds as MM:SS.mmm"""
@@ -116,19 +157,24 @@ def main():
     print(f"Error: Input file not found: {args.input}", file=sys.stderr)
     return 1
   
+  # The input is memory-mapped while the output is written
+  if Path(args.output).resolve() == Path(args.input).resolve():
+    print(f"Error: Output file must differ from input file", file=sys.stderr)
+    return 1
+  
   print(f"Reading input file: {args.input}")
   
   try:
     samples = read_binary_samples(args.input)
     
-    if not samples:
+    if len(samples) == 0:
       print("Error: No samples found in input file", file=sys.stderr)
       return 1
     
     print(f"Loaded {len(samples)} samples")
     
-    first_ts = samples[0][1]
-    last_ts = samples[-1][1]
+    first_ts = samples['timestamp_us'][0]
+    last_ts = samples['timestamp_us'][-1]
     duration_sec = (last_ts - first_ts) / 1_000_000
     
     print(f"File duration: {format_time(duration_sec)}")
@@ -138,18 +184,19 @@ def main():
       print(f"Warning: t1 ({args.t1}s) exceeds file duration ({duration_sec:.3f}s)")
       print(f"         Trimming to end of file")
     
-    trimmed_samples = trim_samples(samples, args.t0, args.t1)
+    lo, hi = find_time_range(samples, args.t0, args.t1)
+    trimmed_samples = samples[lo:hi]
     
-    if not trimmed_samples:
+    if len(trimmed_samples) == 0:
       print("Error: No samples found in specified time range", file=sys.stderr)
       return 1
     
     print(f"Extracted {len(trimmed_samples)} samples")
     
-    write_binary_samples(trimmed_samples, args.output)
+    copy_records(args.input, args.output, lo, hi)
     
-    output_first_ts = trimmed_samples[0][1]
-    output_last_ts = trimmed_samples[-1][1]
+    output_first_ts = trimmed_samples['timestamp_us'][0]
+    output_last_ts = trimmed_samples['timestamp_us'][-1]
     output_duration = (output_last_ts - output_first_ts) / 1_000_000
     
     print(f"Output duration: {format_time(output_duration)}")
@@ -5,25 +5,125 @@ Connects to the embedded system and receives ECG data files.
 """
 
 import socket
+import select
 import sys
 import os
+import errno
+import time
+import queue
+import threading
 import argparse
 from pathlib import Path
 
 
+# Size of each recv() while scanning for header lines
+LINE_RECV_SIZE = 65536
+
+# Longest header line accepted ("FILE <filename> <size>" fits easily)
+MAX_LINE_LENGTH = 4096
+
+# Size of each recv() while downloading file data
+RECV_BUF = 1 << 20
+
+# Receive buffers cycling between the socket and the disk writer thread
+RECV_BUFFERS = 4
+
+# Requested kernel receive buffer for the client socket
+SOCKET_RCVBUF = 4 << 20
+
+# Minimum interval between progress updates (seconds)
+PROGRESS_INTERVAL = 0.05
+
+# Progress is redrawn in place with '\r', which only makes sense on a terminal
+IS_TTY = sys.stdout.isatty()
+PROGRESS_PREFIX = "\r  Progress: "
+
+
+class _DiskWriter:
+  """
+  Writes received chunks to a file descriptor on a background thread.
+
+  Buffers cycle between a free queue and a filled queue, so receiving the
+  next chunk overlaps with writing the previous one. The receiver only
+  blocks when every buffer is still waiting to be written.
+  """
+  
+  def __init__(self, fd, buffers):
+    self.fd = fd
+    self.error = None
+    self._free = queue.Queue()
+    self._filled = queue.Queue()
+    for buffer in buffers:
+      self._free.put(buffer)
+    
+    self._thread = threading.Thread(target=self._run, daemon=True)
+    self._thread.start()
+  
+  def acquire(self):
+    """Get an empty buffer, waiting while all of them are queued for disk"""
+    return self._free.get()
+  
+  def submit(self, buffer, size):
+    """Queue the first size bytes of buffer for writing"""
+    self._filled.put((buffer, size))
+  
+  def close(self):
+    """Write everything still queued and stop the thread"""
+    self._filled.put(None)
+    self._thread.join()
+    if self.error is not None:
+      raise self.error
+  
+  def _run(self):
+    while True:
+      item = self._filled.get()
+      if item is None:
+        return
+      
+      buffer, size = item
+      if self.error is None:
+        try:
+          CardiacTCPClient._write_all(self.fd, buffer[:size])
+        except OSError as e:
+          self.error = e
+      self._free.put(buffer)
+
+
 class CardiacTCPClient:
-  def __init__(self, host, port=8080, output_dir="received_data"):
+  def __init__(self, host, port=8080, output_dir="received_data", use_splice=False):
     self.host = host
     self.port = port
     self.output_dir = Path(output_dir)
     self.socket = None
+    self._pipe = None  # (read_fd, write_fd) used by splice(); None when disabled
+    self._rxbuf = bytearray()  # Bytes received but not yet consumed
+    self._line_chunk = bytearray(LINE_RECV_SIZE)
+    self._recv_views = [memoryview(bytearray(RECV_BUF)) for _ in range(RECV_BUFFERS)]
     
     self.output_dir.mkdir(parents=True, exist_ok=True)
+    
+    if use_splice:
+      self._open_splice_pipe()
+  
+  def _open_splice_pipe(self):
+    """Create the pipe that carries file data from the socket to disk via splice()"""
+    if not hasattr(os, 'splice'):
+      print("! splice() not available on this platform, using recv()/write()")
+      return
+    
+    self._pipe = os.pipe()
+    try:
+      # Larger pipe means fewer splice() round trips per chunk
+      import fcntl
+      fcntl.fcntl(self._pipe[1], fcntl.F_SETPIPE_SZ, RECV_BUF)
+    except (ImportError, AttributeError, OSError):
+      pass
   
   def connect(self):
     """Connect to the server"""
     try:
       self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+      self._configure_socket()
       print(f"Connecting to {self.host}:{self.port}...")
       self.socket.connect((self.host, self.port))
       print(f"✓ Connected to {self.host}:{self.port}")
@@ -38,6 +138,25 @@ class CardiacTCPClient:
       print(f"✗ Connection error: {e}")
       return False
   
+  def _configure_socket(self):
+    """Tune the socket for a short request/response followed by a bulk download"""
+    self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    
+    # Setting SO_RCVBUF turns off Linux receive-buffer autotuning, so only do
+    # it when the kernel will actually grant SOCKET_RCVBUF. Must be set before
+    # connect() so the window scale is negotiated for it.
+    if self._rcvbuf_limit() >= SOCKET_RCVBUF:
+      self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
+  
+  @staticmethod
+  def _rcvbuf_limit():
+    """Largest SO_RCVBUF the kernel grants (net.core.rmem_max); assumed sufficient when unknown"""
+    try:
+      with open('/proc/sys/net/core/rmem_max') as f:
+        return int(f.read())
+    except (OSError, ValueError):
+      return SOCKET_RCVBUF
+  
   def receive_files(self):
     """Receive files from the server"""
     try:
@@ -101,54 +220,152 @@ class CardiacTCPClient:
       # Receive file data
       filepath = self.output_dir / filename
       bytes_received = 0
+      size_str = self._format_size(file_size)
+      last_print_pct = -1
+      last_print_time = 0.0
+      
+      # Unbuffered descriptor: received chunks go straight to the kernel
+      fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+      try:
+        self._preallocate(fd, file_size)
+        
+        # Payload bytes that arrived together with the header lines
+        if self._rxbuf:
+          buffered = min(len(self._rxbuf), file_size)
+          self._write_all(fd, self._rxbuf[:buffered])
+          del self._rxbuf[:buffered]
+          bytes_received += buffered
+        
+        writer = None if self._pipe is not None else _DiskWriter(fd, self._recv_views)
+        try:
+          while bytes_received < file_size:
+            remaining = file_size - bytes_received
+            chunk_size = min(RECV_BUF, remaining)
+            
+            if writer is None:
+              n = self._splice_chunk(fd, chunk_size)
+            else:
+              if writer.error is not None:
+                raise writer.error
+              buffer = writer.acquire()
+              n = self.socket.recv_into(buffer[:chunk_size])
+              writer.submit(buffer, n)
+            
+            if n == 0:
+              print(f"\n✗ Connection closed unexpectedly")
+              return False
+            
+            bytes_received += n
+            
+            # Progress indicator (terminal only): when the whole percentage changes, at most every PROGRESS_INTERVAL
+            pct = bytes_received * 100 // file_size
+            now = time.monotonic()
+            if IS_TTY and pct != last_print_pct and (now - last_print_time >= PROGRESS_INTERVAL or bytes_received == file_size):
+              progress = (bytes_received / file_size) * 100
+              sys.stdout.write(f"{PROGRESS_PREFIX}{progress:.1f}% ({self._format_size(bytes_received)}/{size_str})")
+              sys.stdout.flush()
+              last_print_pct = pct
+              last_print_time = now
+        finally:
+          if writer is not None:
+            writer.close()
+      finally:
+        # Drop the preallocated tail if the transfer did not complete
+        if bytes_received < file_size:
+          os.ftruncate(fd, bytes_received)
+        os.close(fd)
       
-      with open(filepath, 'wb') as f:
-        while bytes_received < file_size:
-          remaining = file_size - bytes_received
-          chunk_size = min(8192, remaining)
-          
-          chunk = self.socket.recv(chunk_size)
-          if not chunk:
-            print(f"\n✗ Connection closed unexpectedly")
-            return False
-          
-          f.write(chunk)
-          bytes_received += len(chunk)
-          
-          # Progress indicator
-          progress = (bytes_received / file_size) * 100
-          print(f"\r  Progress: {progress:.1f}% ({self._format_size(bytes_received)}/{self._format_size(file_size)})", 
-                end='', flush=True)
-      
-      print(f"\n  ✓ Saved to: {filepath}")
+      # Finish the progress line if one was drawn
+      if last_print_pct >= 0:
+        sys.stdout.write("\n")
+      print(f"  ✓ Saved to: {filepath}")
       return True
         
     except Exception as e:
       print(f"\n✗ Error receiving file: {e}")
       return False
   
+  @staticmethod
+  def _preallocate(fd, size):
+    """Reserve the file's blocks up front so the receive loop only fills pages"""
+    if size == 0:
+      return
+    try:
+      os.posix_fallocate(fd, 0, size)
+    except AttributeError:
+      # Not available on this platform: at least set the final size
+      os.ftruncate(fd, size)
+    except OSError as e:
+      # Not supported by the filesystem: same fallback. Anything else
+      # (ENOSPC, EFBIG, ...) means the file cannot be stored, so fail now.
+      if e.errno not in (errno.EOPNOTSUPP, errno.EINVAL, errno.ENOSYS):
+        raise
+      os.ftruncate(fd, size)
+  
+  def _splice_chunk(self, fd, size):
+    """Move up to size bytes socket -> pipe -> file without copying through user space"""
+    pipe_read, pipe_write = self._pipe
+    
+    while True:
+      try:
+        n = os.splice(self.socket.fileno(), pipe_write, size)
+        break
+      except BlockingIOError:
+        # A socket with a timeout has a non-blocking descriptor: wait for data
+        ready, _, _ = select.select([self.socket], [], [], self.socket.gettimeout())
+        if not ready:
+          raise socket.timeout("timed out")
+    
+    moved = 0
+    while moved < n:
+      moved += os.splice(pipe_read, fd, n - moved)
+    return n
+  
+  @staticmethod
+  def _write_all(fd, data):
+    """Write a buffer to a file descriptor, retrying on short writes"""
+    while data:
+      written = os.write(fd, data)
+      data = data[written:]
+  
   def _receive_line(self):
     """Receive a line of text (terminated by \n)"""
-    line = b''
-    while True:
-      char = self.socket.recv(1)
-      if not char:
+    # Fill the buffer in large reads and scan it for the newline
+    newline = self._rxbuf.find(b'\n')
+    while newline < 0:
+      if len(self._rxbuf) > MAX_LINE_LENGTH:
+        raise ValueError(f"Header line exceeds {MAX_LINE_LENGTH} bytes")
+      
+      scanned = len(self._rxbuf)
+      n = self.socket.recv_into(self._line_chunk)
+      if n == 0:
         return None
-      if char == b'\n':
-        break
-      line += char
+      self._rxbuf += memoryview(self._line_chunk)[:n]
+      newline = self._rxbuf.find(b'\n', scanned)
+    
+    if newline > MAX_LINE_LENGTH:
+      raise ValueError(f"Header line exceeds {MAX_LINE_LENGTH} bytes")
+    
+    line = bytes(self._rxbuf[:newline])
+    del self._rxbuf[:newline + 1]
     return line.decode('utf-8').strip()
   
-  def _format_size(self, bytes_size):
+  _UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+  
+  @staticmethod
+  def _format_size(bytes_size):
     """Format bytes to human-readable size"""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-      if bytes_size < 1024.0:
-        return f"{bytes_size:.1f} {unit}"
-      bytes_size /= 1024.0
-    return f"{bytes_size:.1f} TB"
+    # Unit index straight from the bit length: each unit is 2^10 of the previous one
+    exponent = 0 if bytes_size < 1024 else min(4, (bytes_size.bit_length() - 1) // 10)
+    return f"{bytes_size / (1 << (10 * exponent)):.1f} {CardiacTCPClient._UNITS[exponent]}"
   
   def close(self):
     """Close the connection"""
+    if self._pipe:
+      for pipe_fd in self._pipe:
+        os.close(pipe_fd)
+      self._pipe = None
+    
     if self.socket:
       self.socket.close()
       print("\nConnection closed")
@@ -163,6 +380,7 @@ Examples:
   python3 tcp_client.py 192.168.1.100
   python3 tcp_client.py 192.168.1.100 -p 8080
   python3 tcp_client.py 192.168.1.100 -o my_data
+  python3 tcp_client.py 192.168.1.100 --splice
         """
   )
     
@@ -173,6 +391,8 @@ Examples:
                       help='Output directory for received files (default: received_data)')
   parser.add_argument('-t', '--timeout', type=int, default=60,
                       help='Connection timeout in seconds (default: 60)')
+  parser.add_argument('--splice', action='store_true',
+                      help='Linux only: move file data from socket to disk with splice() (zero-copy)')
   
   args = parser.parse_args()
   
@@ -181,7 +401,7 @@ Examples:
   print("=" * 60)
   
   # Create client
-  client = CardiacTCPClient(args.host, args.port, args.output)
+  client = CardiacTCPClient(args.host, args.port, args.output, args.splice)
   
   # Set socket timeout
   socket.setdefaulttimeout(args.timeout)